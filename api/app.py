@@ -5,13 +5,14 @@ import os
 import traceback
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from src.redis_client import r
-from api.logic_evaluator import get_signals_from_redis, debug_single_rule
+from src.redis_client import r, parse_series_key, get_many_series_from_redis
+from api.logic_evaluator import get_signals_from_redis, debug_single_rule, screen_rule, sort_screen_results, is_valid_rule, WINDOW_OPERATIONS
 from api.firestore_client import save_rule, get_all_rules, update_rule, delete_rule, get_rule_by_id
-import json
+import datetime
 from dotenv import load_dotenv
-from typing import List, Optional, cast
-from src.config import MACD_PARAMS
+from typing import List, cast
+from src.config import MACD_PARAMS, INDICATOR_PARAMS, HISTORY_LENGTH, CRYPTO_TICKERS
+from src.indicators import INDICATORS
 
 # Ensure project root is on path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -48,7 +49,17 @@ def get_app_config():
         'timeframes': list(MACD_PARAMS.keys()),
         'operators': ['>', '<', '>=', '<='],
         'macdValues': ['macd_line', 'signal_line', 'histogram'],
-        'macdParamsByTimeframe': valid_params
+        'macdParamsByTimeframe': valid_params,
+        'indicators': {
+            name: {'params': ind.param_names, 'values': ind.outputs}
+            for name, ind in INDICATORS.items()
+        },
+        'indicatorParamsByTimeframe': {
+            timeframe: {**params_by_indicator, 'macd': valid_params.get(timeframe, [])}
+            for timeframe, params_by_indicator in INDICATOR_PARAMS.items()
+        },
+        'historyLengthByTimeframe': HISTORY_LENGTH,
+        'windowOperations': list(WINDOW_OPERATIONS)
     }
     return jsonify(frontend_config)
 
@@ -104,16 +115,25 @@ def get_data(ticker: str):
             return jsonify({"error": f"No data found for {ticker}"}), 404
 
         result = {ticker: {}}
+        series = []
         for key in raw_keys:
             key_str = key.decode('utf-8')
-            _, interval, params = key_str.split(':')
-            data_raw = cast(Optional[bytes], r.get(key))
-            if not data_raw:
+            _, interval, source, _ = parse_series_key(key_str)
+            indicator = INDICATORS.get(source)
+            if indicator:
+                series.append((key_str, interval, indicator))
+
+        histories = get_many_series_from_redis([(key_str, HISTORY_LENGTH.get(interval, 0)) for key_str, interval, _ in series])
+        for (key_str, interval, indicator), rows in zip(series, histories):
+            if rows is None or rows.shape[1] != len(indicator.outputs) + 1:
                 continue
-
-            data_list = json.loads(data_raw.decode('utf-8'))
-            if isinstance(data_list, list) and len(data_list) == 3:
-                result[ticker][f"{interval}:{params}"] = data_list
+            result[ticker][key_str.split(':', 1)[1]] = [
+                {
+                    **dict(zip(indicator.outputs, map(float, row[1:]))),
+                    "time": datetime.datetime.fromtimestamp(row[0], tz=datetime.timezone.utc).isoformat()
+                }
+                for row in rows
+            ]
 
         if not result[ticker]:
             return jsonify({"error": f"No valid data found for {ticker}"}), 404
@@ -148,5 +168,61 @@ def debug_rule(rule_id, ticker):
     debug_result = debug_single_rule(rule_to_debug, ticker)
     return jsonify(debug_result)
 
+@app.route('/api/screen', methods=['GET', 'POST'])
+def screen():
+    """
+    Evaluates one rule across all tickers. The rule is given either as
+    `rule_id` (query string or JSON body) or inline as `rule` in the JSON body.
+    Query options: status=pass|fail|all, sort_by=ticker|result|operand1|operand2,
+    condition=<index used by operand sorting>, order=asc|desc.
+    """
+    auth_error = require_api_key()
+    if auth_error:
+        return auth_error
+
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify({"error": "Provide a 'rule_id' or a 'rule' with a list of 'conditions'."}), 400
+    rule_id = request.args.get('rule_id') or body.get('rule_id')
+    if rule_id:
+        rule = get_rule_by_id(rule_id)
+        if not rule:
+            return jsonify({"error": f"Rule with ID '{rule_id}' not found."}), 404
+    else:
+        rule = body.get('rule')
+
+    if not is_valid_rule(rule):
+        return jsonify({"error": "Provide a 'rule_id' or a 'rule' with a list of 'conditions'."}), 400
+
+    status = request.args.get('status', 'all').lower()
+    sort_by = request.args.get('sort_by', 'ticker')
+    order = request.args.get('order', 'asc').lower()
+    if status not in ('all', 'pass', 'fail') or sort_by not in ('ticker', 'result', 'operand1', 'operand2') or order not in ('asc', 'desc'):
+        return jsonify({"error": "Invalid 'status', 'sort_by' or 'order' parameter."}), 400
+    try:
+        condition_index = int(request.args.get('condition', 0))
+    except ValueError:
+        condition_index = -1
+    if condition_index < 0:
+        return jsonify({"error": "'condition' must be a non-negative integer."}), 400
+
+    try:
+        results = screen_rule(rule, CRYPTO_TICKERS)
+    except Exception:
+        print(traceback.format_exc())
+        return jsonify({"error": "An internal error occurred"}), 500
+
+    passed_count = sum(1 for res in results if res['result'] == "PASS")
+    if status != 'all':
+        results = [res for res in results if res['result'] == status.upper()]
+    results = sort_screen_results(results, sort_by, condition_index, descending=(order == 'desc'))
+
+    return jsonify({
+        "rule_name": rule.get('name', 'N/A'),
+        "tickers_screened": len(CRYPTO_TICKERS),
+        "passed": passed_count,
+        "results": results
+    })
+
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
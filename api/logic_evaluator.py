@@ -1,13 +1,21 @@
 # api/logic_evaluator.py
 
-from src.redis_client import get_macd_from_redis, r
-from src.config import CRYPTO_TICKERS
+from src.redis_client import get_series_from_redis, get_many_series_from_redis, series_key, r
+from src.config import CRYPTO_TICKERS, HISTORY_LENGTH
+from src.indicators import get_indicator
 from api.firestore_client import get_all_rules
 from api.notifications import send_telegram_message
 import json
 import datetime
 import logging
-from typing import cast, List, Dict, Optional
+import numpy as np
+from typing import cast, List, Dict, Optional, Set, Tuple
+
+# (timeframe, source, params) identifying one stored indicator series
+SeriesId = Tuple[str, str, tuple]
+
+# Expression operations reducing an indicator over its last `window` candles
+WINDOW_OPERATIONS = ('min', 'max', 'mean', 'slope')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
@@ -33,6 +41,69 @@ def get_signals_from_redis():
         'signals': {ticker: {"signal": "NO_SIGNAL", "rule_name": None} for ticker in CRYPTO_TICKERS}
     }
 
+def get_operand_source(operand) -> str:
+    """Indicator an operand reads from; operands saved before indicators were pluggable are MACD."""
+    return operand.get('source') or 'macd'
+
+def get_series_id(operand) -> SeriesId:
+    return (operand['timeframe'], get_operand_source(operand), tuple(operand['params']))
+
+def get_field_index(operand) -> Optional[int]:
+    """Column of the operand's output field in a stored series; column 0 holds the candle time."""
+    indicator = get_indicator(get_operand_source(operand))
+    if indicator is None or operand.get('value') not in indicator.outputs:
+        return None
+    return indicator.outputs.index(operand['value']) + 1
+
+def get_series_depth(operand, window=1) -> Optional[int]:
+    """
+    Number of most recent entries needed to read `window` values ending at the
+    operand's offset (0 is the latest candle, -1 the one before, ...), or None
+    if that reaches beyond the configured history.
+    """
+    offset = operand.get('offset', 0)
+    if not isinstance(offset, int) or offset > 0 or not isinstance(window, int) or window < 1:
+        return None
+    depth = window - offset
+    if depth > HISTORY_LENGTH.get(operand['timeframe'], 0):
+        return None
+    return depth
+
+def get_window_operand(operand):
+    """Returns (indicator operand, window size) for a window expression, or (None, None)."""
+    operands = operand.get('operands') or []
+    if len(operands) != 1 or not operands[0] or operands[0].get('type') != 'indicator':
+        return None, None
+    window = operand.get('window')
+    if operand['operation'] == 'slope' and isinstance(window, int) and window < 2:
+        return None, None
+    return operands[0], window
+
+def reduce_window(op, values):
+    """Applies a window operation along the last axis; NaNs propagate."""
+    if op == 'min':
+        return np.min(values, axis=-1)
+    if op == 'max':
+        return np.max(values, axis=-1)
+    if op == 'mean':
+        return np.mean(values, axis=-1)
+    # Least-squares slope per candle, with x centred so sum(x) == 0
+    k = values.shape[-1]
+    x = np.arange(k) - (k - 1) / 2.0
+    return np.sum(values * x, axis=-1) / np.sum(x * x)
+
+def get_indicator_window(operand, ticker, window=1) -> Optional[np.ndarray]:
+    """Reads the last `window` values of an indicator operand, ending at its offset."""
+    field = get_field_index(operand)
+    depth = get_series_depth(operand, window)
+    if field is None or depth is None:
+        return None
+    key = series_key(ticker, operand['timeframe'], get_operand_source(operand), operand['params'])
+    rows = get_series_from_redis(key, depth)
+    if rows is None or len(rows) < depth:
+        return None
+    return rows[:window, field]
+
 def get_operand_value(operand, ticker):
     """Recursively resolves the value of an operand."""
     if not operand:
@@ -41,14 +112,18 @@ def get_operand_value(operand, ticker):
         return operand['value']
 
     if operand['type'] == 'indicator':
-        params_dict = {'fast': operand['params'][0], 'slow': operand['params'][1], 'signal': operand['params'][2]}
-        redis_data = get_macd_from_redis(ticker, operand['timeframe'], params_dict)
-        if not redis_data or len(redis_data) < 3:
-            return None
-        return redis_data[operand['offset'] + 2][operand['value']]
+        values = get_indicator_window(operand, ticker)
+        return None if values is None else float(values[0])
 
     if operand['type'] == 'expression':
         op = operand['operation']
+        if op in WINDOW_OPERATIONS:
+            target, window = get_window_operand(operand)
+            if target is None:
+                return None
+            values = get_indicator_window(target, ticker, window)
+            return None if values is None else float(reduce_window(op, values))
+
         values = [get_operand_value(op_arg, ticker) for op_arg in operand['operands']]
 
         if any(v is None for v in values):
@@ -64,6 +139,40 @@ def get_operand_value(operand, ticker):
 
     return None
 
+def get_operand_dependencies(operand) -> Set[SeriesId]:
+    """Recursively collects the (timeframe, source, params) series an operand reads from."""
+    if not operand:
+        return set()
+    if operand['type'] == 'indicator':
+        return {get_series_id(operand)}
+    if operand['type'] == 'expression':
+        deps = set()
+        for op_arg in operand.get('operands', []):
+            deps |= get_operand_dependencies(op_arg)
+        return deps
+    return set()
+
+def get_rule_dependencies(rule) -> Set[SeriesId]:
+    """Collects every (timeframe, source, params) series referenced by a rule's conditions."""
+    deps = set()
+    for condition in rule.get('conditions') or []:
+        deps |= get_operand_dependencies(condition.get('operand1'))
+        deps |= get_operand_dependencies(condition.get('operand2'))
+    return deps
+
+def build_dependency_index(rules) -> Dict[SeriesId, Set[str]]:
+    """
+    Maps each (timeframe, source, params) series to the IDs of the rules that depend on it.
+    Rules are ticker-agnostic, so the same index serves every ticker.
+    """
+    index: Dict[SeriesId, Set[str]] = {}
+    for rule in rules:
+        if 'id' not in rule:
+            continue
+        for dep in get_rule_dependencies(rule):
+            index.setdefault(dep, set()).add(rule['id'])
+    return index
+
 def evaluate_single_rule(rule, ticker):
     """Evaluates a full rule with all its conditions for a given ticker."""
     if 'conditions' not in rule or not isinstance(rule['conditions'], list):
@@ -93,12 +202,16 @@ def evaluate_single_rule(rule, ticker):
 
     return True
 
-def evaluate_single_ticker(ticker, send_notifications=False):
+def evaluate_single_ticker(ticker, send_notifications=False, rules=None, rule_results=None):
     """
     Loads all rules and evaluates them for a single ticker.
     If a signal is generated, it will send a Telegram alert.
+
+    `rules` may be passed in to skip the Firestore read. `rule_results` is an
+    optional cache of rule ID -> result for this ticker: cached rules are not
+    re-evaluated, and newly evaluated rules are written back into it.
     """
-    all_rules = get_all_rules()
+    all_rules = get_all_rules() if rules is None else rules
     
     current_signals = get_signals_from_redis()
     
@@ -110,7 +223,15 @@ def evaluate_single_ticker(ticker, send_notifications=False):
         return current_signals
 
     for rule in all_rules:
-        if evaluate_single_rule(rule, ticker):
+        rule_id = rule.get('id')
+        if rule_results is not None and rule_id is not None and rule_id in rule_results:
+            is_triggered = rule_results[rule_id]
+        else:
+            is_triggered = evaluate_single_rule(rule, ticker)
+            if rule_results is not None and rule_id is not None:
+                rule_results[rule_id] = is_triggered
+
+        if is_triggered:
             current_signal = rule['signal']
             current_rule_name = rule.get('name', 'Unnamed Rule')
 
@@ -195,4 +316,216 @@ def debug_single_rule(rule, ticker):
     if all_conditions_met:
         debug_log['final_result'] = "PASS"
 
-    return debug_log
\ No newline at end of file
+    return debug_log
+
+COMPARISON_OPS = {
+    '>': np.greater,
+    '<': np.less,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+}
+
+# Number of operands each expression operation takes
+EXPRESSION_ARITY = {'abs': 1, 'divide': 2, **{op: 1 for op in WINDOW_OPERATIONS}}
+
+def is_valid_operand(operand) -> bool:
+    """Checks the shape of a (possibly client-supplied) operand before it is evaluated."""
+    if not isinstance(operand, dict):
+        return False
+    if operand.get('type') == 'literal':
+        return 'value' in operand
+    if operand.get('type') == 'indicator':
+        params = operand.get('params')
+        return (
+            isinstance(operand.get('timeframe'), str)
+            and isinstance(params, (list, tuple))
+            and all(isinstance(p, (int, float)) and not isinstance(p, bool) for p in params)
+            and isinstance(operand.get('value'), str)
+            and isinstance(operand.get('source', 'macd'), (str, type(None)))
+            and isinstance(operand.get('offset', 0), int)
+        )
+    if operand.get('type') == 'expression':
+        operands = operand.get('operands')
+        arity = EXPRESSION_ARITY.get(operand.get('operation'))
+        return (
+            isinstance(operands, list)
+            and len(operands) == arity
+            and all(is_valid_operand(op_arg) for op_arg in operands)
+        )
+    return False
+
+def is_valid_rule(rule) -> bool:
+    """A rule needs a list of condition dicts, each with a known operator and two valid operands."""
+    if not isinstance(rule, dict) or not isinstance(rule.get('conditions'), list):
+        return False
+    for condition in rule['conditions']:
+        if not isinstance(condition, dict) or condition.get('operator') not in COMPARISON_OPS:
+            return False
+        if not is_valid_operand(condition.get('operand1')) or not is_valid_operand(condition.get('operand2')):
+            return False
+    return True
+
+def _collect_series_depths(operand, depths):
+    """Records, per series, the deepest history an operand needs."""
+    if not operand:
+        return
+    if operand['type'] == 'indicator':
+        target, window = operand, 1
+    elif operand['type'] == 'expression' and operand['operation'] in WINDOW_OPERATIONS:
+        target, window = get_window_operand(operand)
+        if target is None:
+            return
+    else:
+        for op_arg in operand.get('operands') or []:
+            _collect_series_depths(op_arg, depths)
+        return
+
+    depth = get_series_depth(target, window)
+    if depth is not None:
+        series_id = get_series_id(target)
+        depths[series_id] = max(depths.get(series_id, 0), depth)
+
+def load_screen_data(rule, tickers):
+    """
+    Loads the history every series a rule depends on needs, for all tickers,
+    in one pipelined Redis round trip. Returns a map of (timeframe, source, params)
+    to a (tickers, depth, columns) array, newest entry last and NaN-padded
+    where a ticker has less history.
+    """
+    depths: Dict[SeriesId, int] = {}
+    for condition in rule['conditions']:
+        _collect_series_depths(condition.get('operand1'), depths)
+        _collect_series_depths(condition.get('operand2'), depths)
+
+    series = sorted(depths, key=str)
+    requests = []
+    for timeframe, source, params in series:
+        requests.extend((series_key(ticker, timeframe, source, params), depths[(timeframe, source, params)]) for ticker in tickers)
+    values = get_many_series_from_redis(requests)
+
+    n = len(tickers)
+    screen_data = {}
+    for i, series_id in enumerate(series):
+        indicator = get_indicator(series_id[1])
+        if indicator is None:
+            continue
+        depth = depths[series_id]
+        data = np.full((n, depth, len(indicator.outputs) + 1), np.nan)
+        for j, rows in enumerate(values[i * n:(i + 1) * n]):
+            if rows is not None and rows.shape[1] == data.shape[2]:
+                data[j, depth - len(rows):, :] = rows
+        screen_data[series_id] = data
+    return screen_data
+
+def get_window_matrix(operand, screen_data, n, window=1):
+    """
+    Resolves the last `window` values of an indicator operand, ending at its
+    offset, for all screened tickers as an (n, window) array.
+    """
+    field = get_field_index(operand)
+    data = screen_data.get(get_series_id(operand))
+    if field is None or data is None or get_series_depth(operand, window) is None:
+        return np.full((n, window if isinstance(window, int) and window > 0 else 1), np.nan)
+    end = data.shape[1] + operand.get('offset', 0)
+    return data[:, end - window:end, field]
+
+def get_operand_vector(operand, screen_data, n):
+    """
+    Resolves an operand across all screened tickers at once.
+    Returns a float array with NaN wherever the value is unavailable.
+    """
+    if not operand:
+        return np.full(n, np.nan)
+    if operand['type'] == 'literal':
+        try:
+            return np.full(n, float(operand['value']))
+        except (TypeError, ValueError):
+            return np.full(n, np.nan)
+
+    if operand['type'] == 'indicator':
+        return get_window_matrix(operand, screen_data, n)[:, -1]
+
+    if operand['type'] == 'expression':
+        op = operand['operation']
+        if op in WINDOW_OPERATIONS:
+            target, window = get_window_operand(operand)
+            if target is None:
+                return np.full(n, np.nan)
+            return reduce_window(op, get_window_matrix(target, screen_data, n, window))
+
+        values = [get_operand_vector(op_arg, screen_data, n) for op_arg in operand['operands']]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if op == 'abs':
+                return np.abs(values[0])
+            if op == 'divide':
+                return np.where(values[1] != 0, values[0] / values[1], np.nan)
+
+    return np.full(n, np.nan)
+
+def _to_json_value(value):
+    return None if np.isnan(value) else float(value)
+
+def screen_rule(rule, tickers=None):
+    """
+    Evaluates a rule across many tickers with one batched Redis read,
+    comparing each condition's operands as arrays across tickers.
+    """
+    tickers = list(tickers or CRYPTO_TICKERS)
+    n = len(tickers)
+    screen_data = load_screen_data(rule, tickers)
+
+    passed = np.ones(n, dtype=bool)
+    condition_columns = []
+    for condition in rule['conditions']:
+        op = condition.get('operator')
+        val1 = get_operand_vector(condition.get('operand1'), screen_data, n)
+        val2 = get_operand_vector(condition.get('operand2'), screen_data, n)
+        compare = COMPARISON_OPS.get(op)
+
+        with np.errstate(invalid='ignore'):
+            is_met = compare(val1, val2) if compare else np.zeros(n, dtype=bool)
+        is_met &= ~(np.isnan(val1) | np.isnan(val2))
+        passed &= is_met
+        condition_columns.append((op, val1, val2, is_met))
+
+    results = []
+    for i, ticker in enumerate(tickers):
+        conditions = []
+        for step, (op, val1, val2, is_met) in enumerate(condition_columns):
+            conditions.append({
+                'step': step + 1,
+                'operand1_value': _to_json_value(val1[i]),
+                'operator': op,
+                'operand2_value': _to_json_value(val2[i]),
+                'result': "PASS" if is_met[i] else "FAIL"
+            })
+        results.append({
+            'ticker': ticker,
+            'result': "PASS" if passed[i] else "FAIL",
+            'conditions': conditions
+        })
+    return results
+
+def sort_screen_results(results, sort_by='ticker', condition_index=0, descending=False):
+    """
+    Sorts screener results by 'ticker', 'result', 'operand1' or 'operand2'
+    (the operand values of the condition at `condition_index`).
+    Results with missing values always sort last.
+    """
+    if sort_by in ('operand1', 'operand2'):
+        field = f"{sort_by}_value"
+
+        def value_of(res):
+            conditions = res['conditions']
+            if not 0 <= condition_index < len(conditions):
+                return None
+            return conditions[condition_index][field]
+
+        present = [res for res in results if value_of(res) is not None]
+        missing = [res for res in results if value_of(res) is None]
+        return sorted(present, key=value_of, reverse=descending) + missing
+
+    if sort_by == 'result':
+        return sorted(results, key=lambda res: (res['result'] != "PASS", res['ticker']), reverse=descending)
+
+    return sorted(results, key=lambda res: res['ticker'], reverse=descending)
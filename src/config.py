@@ -39,4 +39,26 @@ MACD_PARAMS = {
         (1500, 3250, 1125),
         (3000, 6500, 2250)
     ]
-}
\ No newline at end of file
+}
+
+# Indicators other than MACD use the same parameter sets on every timeframe.
+# Tuples are positional, in the order declared by each indicator in src/indicators.py.
+EXTRA_INDICATOR_PARAMS = {
+    'rsi': [(14,)],
+    'ema_cross': [(9, 21), (50, 200)],
+    'atr': [(14,)],
+    'bollinger': [(20, 2)]
+}
+
+INDICATOR_PARAMS = {
+    timeframe: {'macd': macd_params, **EXTRA_INDICATOR_PARAMS}
+    for timeframe, macd_params in MACD_PARAMS.items()
+}
+
+# Number of most recent values kept per indicator series (ring buffer length).
+# Bounds how far back operand offsets and window expressions can look.
+HISTORY_LENGTH = {
+    '1m': 120,
+    '5m': 96,
+    '15m': 64
+}
@@ -1,87 +1,120 @@
 import pandas as pd
-from src.redis_client import get_macd_from_redis, save_macd_to_redis
+import math
+from collections import deque
+from src.config import INDICATOR_PARAMS, HISTORY_LENGTH
+from src.indicators import get_indicator, Candle
+from src.redis_client import series_key, push_series_to_redis
 import logging
-from typing import List, Dict, cast, Union, Tuple
+from typing import List, Dict, Deque, Tuple, cast
 
-# This function is now used to calculate the new MACD values incrementally
-def update_macd_incremental(ticker: str, interval: str, params: Tuple[int, int, int], new_close: float) -> List[Dict]:
-    fast, slow, signal = params
-    
-    key_params = {"fast": fast, "slow": slow, "signal": signal}
-    
-    existing_data = get_macd_from_redis(ticker, interval, key_params)
-    
-    if existing_data:
-        from src.data_fetcher import get_historical_data
-        df = get_historical_data(ticker, period="10m", interval=interval)
-        if df.empty or len(df) <= slow:
-            logging.warning(f"[INSUFFICIENT DATA] Skipping incremental MACD for {ticker} ({interval}).")
-            return []
-            
-        df['close'] = df['Close']
-        df['fast_ema'] = df['close'].ewm(span=fast, adjust=False).mean()
-        df['slow_ema'] = df['close'].ewm(span=slow, adjust=False).mean()
-        df['macd_line'] = df['fast_ema'] - df['slow_ema']
-        df['signal_line'] = df['macd_line'].ewm(span=signal, adjust=False).mean()
-        df['histogram'] = df['macd_line'] - df['signal_line']
-        
-        last_three = df.tail(3)
-        if len(last_three) < 3:
-            return []
-        
-        data_to_save = []
-        for idx, row in last_three.iterrows():
-            ts = cast(pd.Timestamp, idx)
-            date_str = str(ts.date())
-            data_to_save.append({
-                "macd_line": float(row.macd_line.item()),
-                "signal_line": float(row.signal_line.item()),
-                "histogram": float(row.histogram.item()),
-                "date": date_str
-            })
-            
-        save_macd_to_redis(ticker, interval, key_params, data_to_save)
-        return data_to_save
-        
-    else:
-        from src.data_fetcher import get_historical_data
-        df = get_historical_data(ticker, period="7d", interval=interval)
-        if df.empty or len(df) <= slow:
-            logging.warning(f"[INSUFFICIENT DATA] Skipping initial MACD calculation for {ticker} ({interval}).")
-            return []
-            
-        df_macd = add_macd(df.copy(), fast=fast, slow=slow, signal=signal)
-        
-        last_three = df_macd.tail(3)
-        if len(last_three) < 3:
-            return []
+# (ticker, interval) -> recent candles (high/low/close) shared by every indicator on that stream
+_candle_buffers: Dict[Tuple[str, str], Deque[Candle]] = {}
+# (ticker, interval) -> {(source, params): {'state': ..., 'history': ...}}
+# where history is a ring buffer of (candle open time, *outputs) tuples
+_series_states: Dict[Tuple[str, str], Dict[Tuple[str, tuple], dict]] = {}
+
+def _init_stream(ticker: str, interval: str) -> None:
+    """Creates the shared candle buffer and a fresh state for every configured indicator series."""
+    series = {}
+    buffer_size = 1
+    for source, params_list in INDICATOR_PARAMS.get(interval, {}).items():
+        indicator = get_indicator(source)
+        if indicator is None:
+            logging.error(f"[CONFIG ERROR] Unknown indicator '{source}' for {interval}.")
+            continue
+        for params in params_list:
+            params = tuple(params)
+            buffer_size = max(buffer_size, indicator.window(params))
+            series[(source, params)] = {
+                'state': indicator.init_state(params),
+                'history': deque(maxlen=HISTORY_LENGTH[interval])
+            }
+    _candle_buffers[(ticker, interval)] = deque(maxlen=buffer_size)
+    _series_states[(ticker, interval)] = series
+
+def _step(ticker: str, interval: str, candle: Candle, timestamp: float) -> List[Tuple[str, tuple]]:
+    """
+    Feeds one closed candle through every indicator of the stream in a single pass.
+    Returns the series that produced a new value.
+    """
+    # A NaN would stick in every recursive (EMA-style) state, so skip the candle
+    if not all(math.isfinite(candle[field]) for field in ('high', 'low', 'close')):
+        logging.warning(f"[BAD DATA] Skipping non-finite candle for {ticker} ({interval}).")
+        return []
+
+    buffer = _candle_buffers[(ticker, interval)]
+    buffer.append(candle)
+    updated = []
+    for (source, params), series in _series_states[(ticker, interval)].items():
+        indicator = get_indicator(source)
+        values = indicator.update(series['state'], params, candle, buffer)  # type: ignore[union-attr]
+        if values is not None:
+            series['history'].append((timestamp, *(values[field] for field in indicator.outputs)))  # type: ignore[union-attr]
+            updated.append((source, params))
+    return updated
 
-        data_to_save = []
-        for idx, row in last_three.iterrows():
-            ts = cast(pd.Timestamp, idx)
-            date_str = str(ts.date())
-            data_to_save.append({
-                "macd_line": float(row.macd_line.item()),
-                "signal_line": float(row.signal_line.item()),
-                "histogram": float(row.histogram.item()),
-                "date": date_str
-            })
-            
-        save_macd_to_redis(ticker, interval, key_params, data_to_save)
-        return data_to_save
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    col = df[name]
+    # yfinance may return a single-ticker frame with MultiIndex columns
+    if isinstance(col, pd.DataFrame):
+        col = col.iloc[:, 0]
+    return cast(pd.Series, col)
 
-def add_macd(df, fast=12, slow=26, signal=9):
-    if len(df) <= slow:
-        logging.warning(f"[INSUFFICIENT DATA] SKIPPING MACD({fast},{slow},{signal}). Have {len(df)} candles, need > {slow}.")
-        return pd.DataFrame()
+def _seed_from_history(ticker: str, interval: str, before: pd.Timestamp) -> bool:
+    """
+    Warms up all indicator states for a stream from a single history fetch,
+    using only candles that opened before the live candle being processed.
+    """
+    from src.data_fetcher import get_historical_data
+    df = get_historical_data(ticker, period="7d", interval=interval)
+    if df.empty:
+        logging.warning(f"[INSUFFICIENT DATA] Skipping indicator warm-up for {ticker} ({interval}).")
+        return False
 
-    if 'Close' not in df.columns:
-        logging.error("[Error] 'Close' column not found in DataFrame.")
-        return df
+    index = pd.DatetimeIndex(df.index)
+    index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+    highs, lows, closes = _column(df, 'High'), _column(df, 'Low'), _column(df, 'Close')
+    for i, ts in enumerate(index):
+        if ts >= before:
+            break
+        candle = {"high": float(highs.iloc[i]), "low": float(lows.iloc[i]), "close": float(closes.iloc[i])}
+        if not all(math.isfinite(v) for v in candle.values()):
+            continue
+        _step(ticker, interval, candle, ts.timestamp())
+    return True
 
-    df['fast_ema'] = df['Close'].ewm(span=fast, adjust=False).mean()
-    df['slow_ema'] = df['Close'].ewm(span=slow, adjust=False).mean()
-    df['macd_line'] = df['fast_ema'] - df['slow_ema']
-    df['signal_line'] = df['macd_line'].ewm(span=signal, adjust=False).mean()
-    df['histogram'] = df['macd_line'] - df['signal_line']
-    return df
\ No newline at end of file
+def update_indicators(ticker: str, interval: str, candle: Candle, open_time_ms: int) -> Tuple[List[Tuple[str, tuple]], bool]:
+    """
+    Updates every configured indicator for a (ticker, interval) with one closed
+    candle and appends the new values to each series' Redis ring buffer in one
+    pipelined write. History is only fetched once per stream to warm up the
+    streaming state; that first write replaces the stored ring buffers.
+
+    Returns the (source, params) series that got a new value, and whether this
+    candle warmed the stream up (in which case every stored series was rewritten).
+    """
+    open_time = pd.Timestamp(open_time_ms, unit='ms', tz='UTC')
+    stream = (ticker, interval)
+    is_new_stream = stream not in _series_states
+    if is_new_stream:
+        _init_stream(ticker, interval)
+        if not _seed_from_history(ticker, interval, open_time):
+            del _series_states[stream]
+            del _candle_buffers[stream]
+            return [], False
+
+    updated = _step(ticker, interval, candle, open_time.timestamp())
+
+    series_states = _series_states[stream]
+    if is_new_stream:
+        data_to_save = {
+            series_key(ticker, interval, source, params): list(series['history'])
+            for (source, params), series in series_states.items()
+        }
+    else:
+        data_to_save = {
+            series_key(ticker, interval, source, params): [series_states[(source, params)]['history'][-1]]
+            for source, params in updated
+        }
+    push_series_to_redis(data_to_save, maxlen=HISTORY_LENGTH[interval], replace=is_new_stream)
+    return updated, is_new_stream
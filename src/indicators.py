@@ -0,0 +1,172 @@
+# src/indicators.py
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+# A candle is a dict with 'high', 'low' and 'close' floats. Every indicator is
+# updated once per closed candle with its own small state dict and a read-only
+# view of the candle buffer shared by all indicators of a (ticker, interval),
+# whose last element is the candle being processed.
+Candle = Dict[str, float]
+UpdateFn = Callable[[dict, tuple, Candle, Sequence[Candle]], Optional[Dict[str, float]]]
+
+
+class Indicator:
+    def __init__(self, name: str, param_names: List[str], outputs: List[str],
+                 init_state: Callable[[tuple], dict], update: UpdateFn,
+                 window: Callable[[tuple], int] = lambda params: 1):
+        """
+        name:        identifier used by rule operands ('source') and Redis keys.
+        param_names: names of the positional params tuple, e.g. ['fast', 'slow', 'signal'].
+        outputs:     fields returned by `update`, selectable as an operand 'value'.
+        init_state:  builds the fixed-size streaming state for a params tuple.
+        update:      consumes one closed candle, mutates the state and returns the
+                     output fields, or None while the indicator is still warming up.
+        window:      number of most recent candles the update needs from the shared
+                     buffer (including the current one).
+        """
+        self.name = name
+        self.param_names = param_names
+        self.outputs = outputs
+        self.init_state = init_state
+        self.update = update
+        self.window = window
+
+
+INDICATORS: Dict[str, Indicator] = {}
+
+def register_indicator(indicator: Indicator) -> Indicator:
+    INDICATORS[indicator.name] = indicator
+    return indicator
+
+def get_indicator(name: str) -> Optional[Indicator]:
+    return INDICATORS.get(name)
+
+
+def _ema(prev: Optional[float], value: float, alpha: float) -> float:
+    """One step of an exponential moving average, matching pandas ewm(adjust=False)."""
+    return value if prev is None else prev + alpha * (value - prev)
+
+def _span_alpha(span: int) -> float:
+    return 2.0 / (span + 1)
+
+
+# --- MACD ---
+def _update_macd(state, params, candle, buffer):
+    fast, slow, signal = params
+    state['count'] += 1
+    state['fast_ema'] = _ema(state['fast_ema'], candle['close'], _span_alpha(fast))
+    state['slow_ema'] = _ema(state['slow_ema'], candle['close'], _span_alpha(slow))
+    macd_line = state['fast_ema'] - state['slow_ema']
+    state['signal_ema'] = _ema(state['signal_ema'], macd_line, _span_alpha(signal))
+    if state['count'] <= slow:
+        return None
+    return {
+        "macd_line": macd_line,
+        "signal_line": state['signal_ema'],
+        "histogram": macd_line - state['signal_ema']
+    }
+
+register_indicator(Indicator(
+    name='macd',
+    param_names=['fast', 'slow', 'signal'],
+    outputs=['macd_line', 'signal_line', 'histogram'],
+    init_state=lambda params: {'count': 0, 'fast_ema': None, 'slow_ema': None, 'signal_ema': None},
+    update=_update_macd
+))
+
+
+# --- RSI (Wilder smoothing) ---
+def _update_rsi(state, params, candle, buffer):
+    (period,) = params
+    state['count'] += 1
+    if len(buffer) < 2:
+        return None
+    change = candle['close'] - buffer[-2]['close']
+    alpha = 1.0 / period
+    state['avg_gain'] = _ema(state['avg_gain'], max(change, 0.0), alpha)
+    state['avg_loss'] = _ema(state['avg_loss'], max(-change, 0.0), alpha)
+    if state['count'] <= period:
+        return None
+    if state['avg_loss'] == 0:
+        return {"rsi": 100.0}
+    rs = state['avg_gain'] / state['avg_loss']
+    return {"rsi": 100.0 - 100.0 / (1.0 + rs)}
+
+register_indicator(Indicator(
+    name='rsi',
+    param_names=['period'],
+    outputs=['rsi'],
+    init_state=lambda params: {'count': 0, 'avg_gain': None, 'avg_loss': None},
+    update=_update_rsi,
+    window=lambda params: 2
+))
+
+
+# --- EMA crossover ---
+def _update_ema_cross(state, params, candle, buffer):
+    fast, slow = params
+    state['count'] += 1
+    state['fast_ema'] = _ema(state['fast_ema'], candle['close'], _span_alpha(fast))
+    state['slow_ema'] = _ema(state['slow_ema'], candle['close'], _span_alpha(slow))
+    if state['count'] <= slow:
+        return None
+    return {
+        "fast_ema": state['fast_ema'],
+        "slow_ema": state['slow_ema'],
+        "spread": state['fast_ema'] - state['slow_ema']
+    }
+
+register_indicator(Indicator(
+    name='ema_cross',
+    param_names=['fast', 'slow'],
+    outputs=['fast_ema', 'slow_ema', 'spread'],
+    init_state=lambda params: {'count': 0, 'fast_ema': None, 'slow_ema': None},
+    update=_update_ema_cross
+))
+
+
+# --- ATR (Wilder smoothing) ---
+def _update_atr(state, params, candle, buffer):
+    (period,) = params
+    state['count'] += 1
+    true_range = candle['high'] - candle['low']
+    if len(buffer) >= 2:
+        prev_close = buffer[-2]['close']
+        true_range = max(true_range, abs(candle['high'] - prev_close), abs(candle['low'] - prev_close))
+    state['atr'] = _ema(state['atr'], true_range, 1.0 / period)
+    if state['count'] <= period:
+        return None
+    return {"atr": state['atr']}
+
+register_indicator(Indicator(
+    name='atr',
+    param_names=['period'],
+    outputs=['atr'],
+    init_state=lambda params: {'count': 0, 'atr': None},
+    update=_update_atr,
+    window=lambda params: 2
+))
+
+
+# --- Bollinger Bands ---
+def _update_bollinger(state, params, candle, buffer):
+    period, num_std = params
+    if len(buffer) < period:
+        return None
+    closes = [c['close'] for c in list(buffer)[-period:]]
+    middle = sum(closes) / period
+    std = (sum((c - middle) ** 2 for c in closes) / period) ** 0.5
+    return {
+        "middle_band": middle,
+        "upper_band": middle + num_std * std,
+        "lower_band": middle - num_std * std
+    }
+
+register_indicator(Indicator(
+    name='bollinger',
+    param_names=['period', 'num_std'],
+    outputs=['middle_band', 'upper_band', 'lower_band'],
+    init_state=lambda params: {},
+    update=_update_bollinger,
+    window=lambda params: params[0]
+))
@@ -1,28 +1,68 @@
 from binance.websocket.spot.websocket_client import SpotWebsocketClient  # type: ignore
 import json
 import logging
-from src.config import CRYPTO_TICKERS, MACD_PARAMS
-from src.indicator_calculator import update_macd_incremental
-from api.logic_evaluator import evaluate_single_ticker
+from src.config import CRYPTO_TICKERS, INDICATOR_PARAMS
+from src.indicator_calculator import update_indicators
+from src.redis_client import delete_legacy_series_keys
+from api.logic_evaluator import evaluate_single_ticker, build_dependency_index
+from api.firestore_client import get_all_rules
 
 class RealtimeEngine:
     def __init__(self):
         # Prepare the list of Binance stream endpoints for each ticker/interval
         self.streams = self._get_all_streams()
         self.client = None
+        # (timeframe, source, params) -> IDs of rules reading that series
+        self.dependency_index = {}
+        self._rules_fingerprint = None
+        # ticker -> {rule_id: last evaluation result}
+        self.rule_results = {}
 
     def _get_all_streams(self):
         streams = []
         for ticker in CRYPTO_TICKERS:
             symbol = ticker.lower()
-            for interval in MACD_PARAMS.keys():
+            for interval in INDICATOR_PARAMS.keys():
                 streams.append(f"{symbol}@kline_{interval}")
         return streams
 
+    def _refresh_dependency_index(self, rules):
+        """
+        Rebuild the rule dependency index when the rule set has changed since
+        the last candle, dropping cached results that may no longer be valid.
+        """
+        fingerprint = json.dumps(rules, sort_keys=True, default=str)
+        if fingerprint == self._rules_fingerprint:
+            return
+        self._rules_fingerprint = fingerprint
+        self.dependency_index = build_dependency_index(rules)
+        self.rule_results = {}
+        logging.info(f"Rebuilt rule dependency index for {len(rules)} rules.")
+
+    def _invalidate_rules(self, ticker, interval, updated, is_warm_up):
+        """
+        Drop cached results for rules that read any (source, params) series
+        updated by a closed candle on this ticker/interval, or every rule on
+        that interval when the candle warmed the stream up. Returns the number
+        invalidated.
+        """
+        cached = self.rule_results.setdefault(ticker, {})
+        affected = set()
+        if is_warm_up:
+            for (timeframe, _, _), rule_ids in self.dependency_index.items():
+                if timeframe == interval:
+                    affected |= rule_ids
+        else:
+            for source, params in updated:
+                affected |= self.dependency_index.get((interval, source, params), set())
+        for rule_id in affected:
+            cached.pop(rule_id, None)
+        return len(affected)
+
     def _handle_socket_message(self, msg):
         """
         Handle incoming WebSocket messages, process closed kline events,
-        update MACD values, and evaluate trade logic.
+        update indicator values, and evaluate trade logic.
         """
         try:
             if 'stream' in msg and 'data' in msg:
@@ -36,21 +76,28 @@ class RealtimeEngine:
 
                     symbol = kline['s']  # e.g., 'BTCUSDT'
                     interval = kline['i']  # e.g., '1m'
-                    close_price = float(kline['c'])
+                    candle = {
+                        "high": float(kline['h']),
+                        "low": float(kline['l']),
+                        "close": float(kline['c'])
+                    }
                     ticker = symbol.upper()
 
-                    # Update MACD for each parameter set
-                    for fast, slow, signal in MACD_PARAMS.get(interval, []):
-                        update_macd_incremental(
-                            ticker,
-                            interval,
-                            (fast, slow, signal),
-                            close_price
-                        )
+                    # Update every indicator series for this ticker/interval in one pass
+                    updated, is_warm_up = update_indicators(ticker, interval, candle, int(kline['t']))
 
-                    # Evaluate trading rules and optionally notify
-                    evaluate_single_ticker(ticker, send_notifications=True)
-                    logging.info(f"Processed closed candle for {ticker} on {interval}. Rules evaluated.")
+                    # Re-evaluate only the rules depending on the updated series,
+                    # reusing cached results for the rest, and optionally notify
+                    all_rules = get_all_rules()
+                    self._refresh_dependency_index(all_rules)
+                    affected = self._invalidate_rules(ticker, interval, updated, is_warm_up)
+                    evaluate_single_ticker(
+                        ticker,
+                        send_notifications=True,
+                        rules=all_rules,
+                        rule_results=self.rule_results[ticker]
+                    )
+                    logging.info(f"Processed closed candle for {ticker} on {interval}. {affected}/{len(all_rules)} rules invalidated.")
         except KeyError:
             logging.error(f"[WEBSOCKET ERROR] Malformed message: {msg}")
         except Exception as e:
@@ -60,13 +107,16 @@ class RealtimeEngine:
         """
         Initialize and start the Binance WebSocket client with all kline streams.
         """
+        # Series written before the ring-buffer layout are JSON strings under the same keys
+        delete_legacy_series_keys()
+
         # Initialize client, ignoring missing type stubs
         self.client = SpotWebsocketClient(on_message=self._handle_socket_message)  # type: ignore
         self.client.start()
 
         # Subscribe to kline streams for all symbols/intervals
         symbols = [t.lower() for t in CRYPTO_TICKERS]
-        intervals = list(MACD_PARAMS.keys())
+        intervals = list(INDICATOR_PARAMS.keys())
         # Using multiplex subscription
         self.client.kline_stream(symbols=symbols, interval=intervals)  # type: ignore
 
@@ -2,9 +2,11 @@
 
 import redis
 from redis import Redis
-from typing import Optional, cast, Union, List
+from typing import Optional, cast, List, Dict, Sequence, Tuple
+import numpy as np
 import os
-import json
+import struct
+from src.config import CRYPTO_TICKERS, INDICATOR_PARAMS
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
@@ -12,22 +14,120 @@ REDIS_DB = int(os.getenv("REDIS_DB", 0))
 
 r: Redis = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
 
-def save_macd_to_redis(ticker: str, interval: str, params: dict, data: Union[dict, List[dict]]) -> None:
-    key = f"{ticker}:{interval}:{params['fast']}-{params['slow']}-{params['signal']}"
+def series_key(ticker: str, interval: str, source: str, params: Sequence) -> str:
+    """
+    Redis key of an indicator series. MACD keeps the original
+    '<ticker>:<interval>:<fast>-<slow>-<signal>' layout; other indicators
+    prefix their params with the indicator name, e.g. 'BTCUSDT:1m:rsi-14'.
+    """
+    params_str = '-'.join(str(p) for p in params)
+    if source == 'macd':
+        return f"{ticker}:{interval}:{params_str}"
+    return f"{ticker}:{interval}:{source}-{params_str}"
+
+def parse_series_key(key: str) -> Tuple[str, str, str, str]:
+    """Inverse of series_key: returns (ticker, interval, source, params string)."""
+    ticker, interval, series = key.split(':')
+    head, _, rest = series.partition('-')
+    if head.isdigit():
+        return ticker, interval, 'macd', series
+    return ticker, interval, head, rest
+
+def pack_series_entry(entry: Sequence[float]) -> bytes:
+    """Packs one series entry (candle time followed by the indicator outputs) as little-endian float64s."""
+    return struct.pack(f"<{len(entry)}d", *entry)
+
+def unpack_series(raw_entries: List[bytes]) -> Optional[np.ndarray]:
+    """Decodes packed entries into a (rows, columns) float array, oldest first."""
+    if not raw_entries:
+        return None
+    return np.frombuffer(b"".join(raw_entries), dtype="<f8").reshape(len(raw_entries), -1)
+
+def push_series_to_redis(entries: Dict[str, List[Sequence[float]]], maxlen: int, replace: bool = False) -> None:
+    """
+    Appends entries to each series' Redis list and trims it to the last `maxlen`,
+    so every list behaves as a fixed-size ring buffer. With `replace`, existing
+    lists are dropped first. All keys are written in one pipelined round trip.
+    """
+    if not entries:
+        return
     try:
-        r.set(key, json.dumps(data))
-        print(f"[REDIS] Saved MACD for {key}")
+        pipe = r.pipeline(transaction=False)
+        for key, key_entries in entries.items():
+            if replace:
+                pipe.delete(key)
+            if key_entries:
+                pipe.rpush(key, *[pack_series_entry(e) for e in key_entries])
+                pipe.ltrim(key, -maxlen, -1)
+        errors = [res for res in pipe.execute(raise_on_error=False) if isinstance(res, Exception)]
+        for error in errors:
+            print(f"[REDIS ERROR] Failed to save a series: {error}")
+        print(f"[REDIS] Saved {len(entries)} series")
     except Exception as e:
-        print(f"[REDIS ERROR] Failed to save {key}: {e}")
+        print(f"[REDIS ERROR] Failed to save {len(entries)} series: {e}")
 
-def get_macd_from_redis(ticker: str, interval: str, params: dict) -> Optional[List[dict]]:
-    key = f"{ticker}:{interval}:{params['fast']}-{params['slow']}-{params['signal']}"
+def get_series_from_redis(key: str, count: int) -> Optional[np.ndarray]:
+    """Fetches the last `count` entries of a series, oldest first."""
     try:
-        val = r.get(key)
-        if val:
-            val = cast(bytes, val)
-            return json.loads(val.decode("utf-8"))
-        return None
+        raw = cast(List[bytes], r.lrange(key, -count, -1))
+        return unpack_series(raw)
     except Exception as e:
         print(f"[REDIS ERROR] Failed to fetch {key}: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def get_many_series_from_redis(requests: List[Tuple[str, int]]) -> List[Optional[np.ndarray]]:
+    """
+    Fetches the last `count` entries of several series in a single pipelined
+    round trip. Missing or unreadable series come back as None.
+    """
+    if not requests:
+        return []
+    try:
+        pipe = r.pipeline(transaction=False)
+        for key, count in requests:
+            pipe.lrange(key, -count, -1)
+        # A failing command (e.g. WRONGTYPE on a stale key) only affects its own series
+        raw_lists = pipe.execute(raise_on_error=False)
+    except Exception as e:
+        print(f"[REDIS ERROR] Failed to fetch {len(requests)} series: {e}")
+        return [None] * len(requests)
+
+    results: List[Optional[np.ndarray]] = []
+    for (key, _), raw in zip(requests, raw_lists):
+        if isinstance(raw, Exception):
+            print(f"[REDIS ERROR] Failed to fetch {key}: {raw}")
+            results.append(None)
+            continue
+        try:
+            results.append(unpack_series(cast(List[bytes], raw)))
+        except ValueError:
+            results.append(None)
+    return results
+
+def delete_legacy_series_keys() -> int:
+    """
+    Deletes configured indicator series keys that still hold the JSON strings
+    written before series became ring-buffer lists, so they cannot shadow the
+    list under the same name. Only exact series keys are checked, with one
+    pipelined TYPE round trip. Returns the number of keys deleted.
+    """
+    keys = [
+        series_key(ticker, interval, source, params)
+        for ticker in CRYPTO_TICKERS
+        for interval, params_by_indicator in INDICATOR_PARAMS.items()
+        for source, params_list in params_by_indicator.items()
+        for params in params_list
+    ]
+    try:
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            pipe.type(key)
+        key_types = pipe.execute()
+        legacy_keys = [key for key, key_type in zip(keys, key_types) if key_type == b"string"]
+        if legacy_keys:
+            r.delete(*legacy_keys)
+        print(f"[REDIS] Deleted {len(legacy_keys)} legacy series keys")
+        return len(legacy_keys)
+    except Exception as e:
+        print(f"[REDIS ERROR] Failed to delete legacy series keys: {e}")
+        return 0